@@ -6,79 +6,187 @@ Fetches Merriam-Webster's word of the day and sends it via SMS
 using an email-to-SMS gateway.
 """
 
+# Heavier modules (lxml, feedparser, smtplib, ...) are imported where they
+# are used so a run served from the on-disk cache doesn't pay for them.
+import json
 import os
-import smtplib
-import ssl
-from email.mime.text import MIMEText
-import feedparser
-import re
-from html import unescape
+from datetime import date
+
+
+FEED_URL = "https://www.merriam-webster.com/wotd/feed/rss2"
+USER_AGENT = "word-of-day/1.0"
+
+# AT&T MMS gateway - often works when txt.att.net doesn't
+SMS_GATEWAY = "mms.att.net"
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'word-of-day')
+STATE_FILE = os.path.join(CACHE_DIR, 'state.json')
+
+_ssl_context = None
+
+
+def _read_json(path):
+    """Load a cached JSON file, or None if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    """Atomically write data to a cache file.
+    
+    The cache is only an optimization, so an unwritable cache directory
+    is reported and otherwise ignored.
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write cache file {path}: {e}")
+
+
+def _prune_date_files(keep):
+    """Remove cached <date>.json files other than keep."""
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if ext != '.json' or name == keep:
+            continue
+        try:
+            date.fromisoformat(stem)
+        except ValueError:
+            continue  # Not a date file, e.g. state.json
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except OSError:
+            pass
 
 
 def get_word_of_the_day():
+    """Get today's word, from the on-disk cache if it has already been fetched."""
+    today_name = f"{date.today().isoformat()}.json"
+    today_file = os.path.join(CACHE_DIR, today_name)
+    word_data = _read_json(today_file)
+    if word_data:
+        return word_data
+    
+    word_data = fetch_word_of_the_day()
+    _write_json(today_file, word_data)
+    _prune_date_files(keep=today_name)
+    return word_data
+
+
+def fetch_word_of_the_day():
     """Fetch the word of the day from Merriam-Webster's RSS feed."""
-    feed_url = "https://www.merriam-webster.com/wotd/feed/rss2"
-    feed = feedparser.parse(feed_url)
+    import urllib.error
+    import urllib.request
+    
+    state = _read_json(STATE_FILE) or {}
+    headers = {'User-Agent': USER_AGENT}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('modified'):
+        headers['If-Modified-Since'] = state['modified']
+    request = urllib.request.Request(FEED_URL, headers=headers)
     
-    if not feed.entries:
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            etag = response.headers.get('ETag')
+            modified = response.headers.get('Last-Modified')
+            entry = _first_item(response)
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+        entry = None
+    
+    # Feed unchanged since the last run - reuse what we parsed then
+    if entry is None:
+        if state.get('word_data'):
+            return state['word_data']
         raise Exception("No entries found in RSS feed")
     
-    entry = feed.entries[0]
+    word, description = entry
+    word_data = parse_entry(word, description)
+    
+    _write_json(STATE_FILE, {
+        'etag': etag,
+        'modified': modified,
+        'word_data': word_data,
+    })
+    return word_data
+
+
+def _first_item(response):
+    """Return (title, description) of the feed's first item, or None.
+    
+    The response is parsed incrementally and parsing stops as soon as the
+    first <item> closes, so only the read buffers needed to reach it (one
+    for a feed of Merriam-Webster's size) are consumed.
+    """
+    import lxml.etree as ET
     
-    # The title contains the word
-    word = entry.title.strip()
+    try:
+        for _, item in ET.iterparse(response, tag='item'):
+            return item.findtext('title').strip(), item.findtext('description')
+    except ET.XMLSyntaxError:
+        # Not well-formed XML - let feedparser's lenient parser have a go
+        import feedparser
+        feed = feedparser.parse(FEED_URL, agent=USER_AGENT)
+        if feed.entries:
+            return feed.entries[0].title.strip(), feed.entries[0].description
+    return None
+
+
+def parse_entry(word, description):
+    """Extract part of speech, definition and example from a feed entry."""
+    import lxml.html
     
     # Parse the description HTML
-    description = entry.description
-    
-    # Extract part of speech - appears after bullet as <em>adjective</em>
-    # Pattern: • \pronunciation\ • <em>part_of_speech</em>
-    pos_match = re.search(r'\\[^\\]+\\[^<]*<em>(\w+)</em>', description)
-    part_of_speech = pos_match.group(1).strip() if pos_match else ""
-    
-    # Extract definition - the paragraph that explains what the word means
-    # It typically contains the word in <em> tags and describes it
-    # Look for <p><em>Word</em> describes/means/is...
-    def_match = re.search(
-        rf'<p>\s*<em>{re.escape(word)}</em>\s+([^<]+(?:<[^>]+>[^<]*)*?)</p>',
-        description,
-        re.IGNORECASE
-    )
-    if def_match:
-        definition = def_match.group(1)
-        definition = re.sub(r'<[^>]+>', '', definition)
-        definition = unescape(definition).strip()
-        # Capitalize first letter
-        if definition:
-            definition = definition[0].upper() + definition[1:]
-    else:
-        # Fallback: find paragraphs and pick the definition-like one
-        definition = ""
-        paragraphs = re.findall(r'<p>(.*?)</p>', description, re.DOTALL)
-        for p in paragraphs:
-            clean_p = re.sub(r'<[^>]+>', '', p)
-            clean_p = unescape(clean_p).strip()
-            # Look for descriptive text (not examples, not links)
-            if (clean_p and 
-                not clean_p.startswith('//') and 
-                'See the entry' not in clean_p and
-                'Examples:' not in clean_p and
-                word.lower() in clean_p.lower() and
-                len(clean_p) > 30):
-                definition = clean_p
-                break
-    
-    # Extract example sentence (starts with //)
-    example_match = re.search(r'//\s*([^<]+)', description)
-    if example_match:
-        example = example_match.group(1)
-        example = re.sub(r'<[^>]+>', '', example)
-        example = unescape(example).strip()
-        # Remove trailing period if present, then wrap in quotes
-        example = example.rstrip('.')
-        example = f'"{example}."'
-    else:
-        example = ""
+    frag = lxml.html.fragment_fromstring(description, create_parent='div')
+    
+    # Extract part of speech - the first <em> after the pronunciation
+    # Pattern: <strong>word</strong> • \pronunciation\ • <em>part_of_speech</em>
+    part_of_speech = frag.xpath(
+        'string((.//em[preceding::text()[contains(., "\\")]])[1])'
+    ).strip()
+    
+    # Walk the paragraphs once, picking out the definition and example
+    word_lower = word.lower()
+    definition = ""
+    example = ""
+    for p in frag.iter('p'):
+        text = p.text_content().strip()
+        
+        if text.startswith('//'):
+            # Example sentence - remove trailing period, then wrap in quotes
+            if not example:
+                example = text[2:].strip().rstrip('.')
+                example = f'"{example}."'
+        elif not definition and 'See the entry' not in text:
+            # Definition mentions the word in <em> tags:
+            # <p><em>Word</em> describes/means/is... or <p>To be <em>word</em> is...
+            if any(em.text_content().strip().lower() == word_lower
+                   for em in p.iter('em')):
+                # Drop a leading "Word" so "Word means..." becomes "Means..."
+                if (text[:len(word)].lower() == word_lower and
+                        not text[len(word):len(word) + 1].isalnum()):
+                    definition = text[len(word):].strip()
+                else:
+                    definition = text
+                # Capitalize first letter
+                if definition:
+                    definition = definition[0].upper() + definition[1:]
+        
+        if definition and example:
+            break
     
     return {
         'word': word,
@@ -96,44 +204,128 @@ def format_sms_message(word_data):
     example = word_data['example']
     
     # Build message with character limit in mind (~160 chars per SMS)
-    message = f"Word of the Day: {word}\n\n"
+    parts = [f"Word of the Day: {word}\n\n"]
     
     if pos:
-        message += f"({pos}) "
+        parts.append(f"({pos}) ")
     
     # Truncate definition if needed to fit in SMS
-    max_def_len = 120 - len(message)
+    header_len = sum(map(len, parts))
+    max_def_len = 120 - header_len
     if len(definition) > max_def_len:
         definition = definition[:max_def_len-3] + "..."
     
-    message += definition
+    parts.append(definition)
     
     # Add example if there's room
-    if example and len(message) + len(example) < 300:
-        message += f'\n\n{example}'
+    if example and header_len + len(definition) + len(example) < 300:
+        parts.append(f'\n\n{example}')
     
-    return message
+    return ''.join(parts)
+
+
+def _get_ssl_context():
+    """Return a shared SSL context, creating it on first use."""
+    global _ssl_context
+    if _ssl_context is None:
+        import ssl
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
 
 
-def send_sms(message, phone_number, gmail_address, gmail_password):
-    """Send SMS via AT&T MMS gateway (more reliable than SMS gateway)."""
-    # AT&T MMS gateway - often works when txt.att.net doesn't
-    sms_gateway = f"{phone_number}@mms.att.net"
+class SmsSender:
+    """Gmail SMTP session that can send several SMS messages.
     
-    # Create message
-    msg = MIMEText(message)
-    msg['From'] = gmail_address
-    msg['To'] = sms_gateway
-    msg['Subject'] = ""  # SMS doesn't need subject
+    The TLS handshake and login happen once in __enter__ and are reused
+    for every send() until the with-block exits.
+    """
     
-    # Send via Gmail SMTP
-    context = ssl.create_default_context()
+    def __init__(self, gmail_address, gmail_password):
+        self.gmail_address = gmail_address
+        self.gmail_password = gmail_password
+        self.server = None
     
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-        server.login(gmail_address, gmail_password)
-        server.sendmail(gmail_address, sms_gateway, msg.as_string())
+    def __enter__(self):
+        self.connect()
+        return self
     
-    print(f"SMS sent successfully to {phone_number}")
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def connect(self):
+        """Open and authenticate the SMTP session."""
+        import smtplib
+        
+        self.server = smtplib.SMTP_SSL("smtp.gmail.com", 465, context=_get_ssl_context())
+        self.server.login(self.gmail_address, self.gmail_password)
+    
+    def close(self):
+        """Close the SMTP session if it is open."""
+        import smtplib
+        
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except smtplib.SMTPServerDisconnected:
+                pass
+            self.server = None
+    
+    def send(self, message, phone_number):
+        """Send an SMS to a single phone number."""
+        self.send_all(message, [phone_number])
+    
+    def send_all(self, message, phone_numbers):
+        """Send the same SMS to several phone numbers via SMS_GATEWAY."""
+        # A bare plain-text frame is all an SMS gateway needs, so build it
+        # by hand rather than going through email.mime
+        if message.isascii():
+            charset, encoding, mail_options = 'us-ascii', '7bit', ()
+        else:
+            charset, encoding, mail_options = 'utf-8', '8bit', ('BODY=8BITMIME',)
+        body = message.replace('\n', '\r\n').encode(charset)
+        
+        for phone_number in phone_numbers:
+            sms_gateway = f"{phone_number}@{SMS_GATEWAY}"
+            headers = (
+                f"From: {self.gmail_address}\r\n"
+                f"To: {sms_gateway}\r\n"
+                "Subject: \r\n"  # SMS doesn't need subject
+                "MIME-Version: 1.0\r\n"
+                f"Content-Type: text/plain; charset={charset}\r\n"
+                f"Content-Transfer-Encoding: {encoding}\r\n"
+                "\r\n"
+            )
+            self._sendmail(sms_gateway, headers.encode('ascii') + body, mail_options)
+            print(f"SMS sent successfully to {phone_number}")
+    
+    def _sendmail(self, to_addr, frame, mail_options):
+        import smtplib
+        
+        try:
+            self.server.sendmail(self.gmail_address, to_addr, frame, mail_options)
+        except smtplib.SMTPServerDisconnected:
+            # Gmail drops idle sessions - reconnect once and retry
+            self.server = None
+            self.connect()
+            self.server.sendmail(self.gmail_address, to_addr, frame, mail_options)
+
+
+def parse_phone_numbers(value):
+    """Parse a comma-separated list of phone numbers into 10-digit strings."""
+    phone_numbers = []
+    for phone_number in value.split(','):
+        # Remove any non-digit characters from phone number
+        phone_number = ''.join(filter(str.isdecimal, phone_number))
+        
+        # Accept 10 or 11 digit numbers (with or without leading 1)
+        if len(phone_number) == 11 and phone_number.startswith('1'):
+            phone_number = phone_number[1:]  # Strip leading 1, the gateway address doesn't use it
+        
+        if len(phone_number) != 10:
+            raise ValueError("Phone number must be 10 digits (or 11 with leading 1)")
+        
+        phone_numbers.append(phone_number)
+    return phone_numbers
 
 
 def main():
@@ -142,21 +334,13 @@ def main():
     gmail_address = os.environ.get('GMAIL_ADDRESS')
     gmail_password = os.environ.get('GMAIL_APP_PASSWORD')
     
-    if not all([phone_number, gmail_address, gmail_password]):
+    if not (phone_number and gmail_address and gmail_password):
         raise ValueError(
             "Missing required environment variables. "
             "Please set PHONE_NUMBER, GMAIL_ADDRESS, and GMAIL_APP_PASSWORD"
         )
     
-    # Remove any non-digit characters from phone number
-    phone_number = re.sub(r'\D', '', phone_number)
-    
-    # Accept 10 or 11 digit numbers (with or without leading 1)
-    if len(phone_number) == 11 and phone_number.startswith('1'):
-        phone_number = phone_number[1:]  # Strip leading 1, we'll add it back in send_sms
-    
-    if len(phone_number) != 10:
-        raise ValueError("Phone number must be 10 digits (or 11 with leading 1)")
+    phone_numbers = parse_phone_numbers(phone_number)
     
     # Fetch word of the day
     print("Fetching word of the day...")
@@ -167,7 +351,8 @@ def main():
     message = format_sms_message(word_data)
     print(f"Message:\n{message}\n")
     
-    send_sms(message, phone_number, gmail_address, gmail_password)
+    with SmsSender(gmail_address, gmail_password) as sender:
+        sender.send_all(message, phone_numbers)
 
 
 if __name__ == "__main__":